@@ -1,15 +1,20 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, Response
 from flask_socketio import SocketIO, emit
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 import cv2
 import numpy as np
 import os
 import base64
-from collections import OrderedDict
-from scipy.spatial import distance as dist
 from collections import deque
 import requests
 import os
+import time
+import hmac
+from utils import metrics
+from utils.metrics import timed
+from utils.video_processing import (CrowdCounter, predict_age_gender,
+                                    person_boxes, detect_faces)
+from utils.inference_profiles import get_profile, apply_thread_settings, configure_dnn_net, load_yolo
 
 # ------------------ GEMINI CONFIG ------------------
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -58,36 +63,20 @@ def check_file(path):
 for p in [FACE_CASCADE_PATH, AGE_PROTO, AGE_MODEL, GENDER_PROTO, GENDER_MODEL]:
     check_file(p)
 
+# ------------------ INFERENCE PROFILE ------------------
+# accurate (default) | balanced | fast — see utils/inference_profiles.py
+INFERENCE_PROFILE = get_profile(os.getenv("INFERENCE_PROFILE"))
+apply_thread_settings(INFERENCE_PROFILE)
+
 # ------------------ LOAD MODELS ------------------
-face_cascade = cv2.CascadeClassifier(FACE_CASCADE_PATH)
+face_cascade = metrics.load_model("haar_face", cv2.CascadeClassifier, FACE_CASCADE_PATH)
 if face_cascade.empty():
     raise RuntimeError("Failed to load Haar cascade. Check path: " + FACE_CASCADE_PATH)
 
-age_net = cv2.dnn.readNetFromCaffe(AGE_PROTO, AGE_MODEL)
-gender_net = cv2.dnn.readNetFromCaffe(GENDER_PROTO, GENDER_MODEL)
-
-AGE_LIST = ['(0-2)', '(4-6)', '(8-12)', '(15-20)',
-            '(25-32)', '(38-43)', '(48-53)', '(60-100)']
-
-GENDER_LIST = ['Male', 'Female']
-
-AGE_MEAN = (78.4263377603, 87.7689143744, 114.895847746)
-
-
-# ✅ FIXED 5-YEAR AGE GROUP MAPPING
-def age_band_to_5yr_group(age_range):
-    mapping = {
-        "(0-2)": "0-5",
-        "(4-6)": "5-10",
-        "(8-12)": "10-15",
-        "(15-20)": "15-20",
-        "(25-32)": "20-25",
-        "(38-43)": "35-40",
-        "(48-53)": "45-50",
-        "(60-100)": "60+"
-    }
-    return mapping.get(age_range, "Unknown")
-
+age_net = metrics.load_model("age_net", cv2.dnn.readNetFromCaffe, AGE_PROTO, AGE_MODEL)
+gender_net = metrics.load_model("gender_net", cv2.dnn.readNetFromCaffe, GENDER_PROTO, GENDER_MODEL)
+configure_dnn_net(age_net, INFERENCE_PROFILE)
+configure_dnn_net(gender_net, INFERENCE_PROFILE)
 
 # ------------------ STATE ------------------
 state = {
@@ -98,80 +87,6 @@ state = {
 UPLOAD_DIR = os.path.join(ROOT, 'uploads')
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-# ------------------ SIMPLE CENTROID TRACKER ------------------
-class CentroidTracker:
-    def __init__(self, maxDisappeared=40):  # Fixed: was _init_
-        self.nextObjectID = 0
-        self.objects = OrderedDict()   # id -> centroid (x,y)
-        self.disappeared = OrderedDict()
-        self.maxDisappeared = maxDisappeared
-
-    def register(self, centroid):
-        self.objects[self.nextObjectID] = centroid
-        self.disappeared[self.nextObjectID] = 0
-        self.nextObjectID += 1
-
-    def deregister(self, objectID):
-        if objectID in self.objects:
-            del self.objects[objectID]
-        if objectID in self.disappeared:
-            del self.disappeared[objectID]
-
-    def update(self, rects):
-        # rects: list of (x1,y1,x2,y2)
-        if len(rects) == 0:
-            # mark all as disappeared
-            for objectID in list(self.disappeared.keys()):
-                self.disappeared[objectID] += 1
-                if self.disappeared[objectID] > self.maxDisappeared:
-                    self.deregister(objectID)
-            return self.objects
-
-        inputCentroids = []
-        for (x1,y1,x2,y2) in rects:
-            cX = int((x1 + x2) / 2.0)
-            cY = int((y1 + y2) / 2.0)
-            inputCentroids.append((cX, cY))
-
-        if len(self.objects) == 0:
-            for c in inputCentroids:
-                self.register(c)
-        else:
-            objectIDs = list(self.objects.keys())
-            objectCentroids = list(self.objects.values())
-
-            D = dist.cdist(np.array(objectCentroids), np.array(inputCentroids))
-            rows = D.min(axis=1).argsort()
-            cols = D.argmin(axis=1)[rows]
-
-            usedRows = set()
-            usedCols = set()
-
-            for (r, c) in zip(rows, cols):
-                if r in usedRows or c in usedCols:
-                    continue
-                objectID = objectIDs[r]
-                self.objects[objectID] = inputCentroids[c]
-                self.disappeared[objectID] = 0
-                usedRows.add(r)
-                usedCols.add(c)
-
-            unusedRows = set(range(0, D.shape[0])) - usedRows
-            unusedCols = set(range(0, D.shape[1])) - usedCols
-
-            # disappeared objects
-            for r in unusedRows:
-                objectID = objectIDs[r]
-                self.disappeared[objectID] += 1
-                if self.disappeared[objectID] > self.maxDisappeared:
-                    self.deregister(objectID)
-
-            # new objects
-            for c in unusedCols:
-                self.register(inputCentroids[c])
-
-        return self.objects
-
 # ------------------ USER MODEL FOR FLASK-LOGIN ------------------
 class User(UserMixin):
     def __init__(self, id, username, password, is_admin=False):
@@ -246,6 +161,7 @@ def toggle_parking():
         return jsonify(success=False, message="Invalid slot"), 400
     state['parking'][slot] = 'free' if state['parking'][slot] == 'booked' else 'booked'
     socketio.emit('parking_update', state['parking'])
+    metrics.SOCKET_EMITS.inc(event='parking_update')
     return jsonify(success=True, state=state['parking'])
 
 # ------------------ HELPERS: AGE/GENDER PREDICT ------------------
@@ -260,9 +176,7 @@ MODEL_MEAN_VALUES = (78.4263377603, 87.7689143744, 114.895847746)
 age_list = ["(0-2)", "(4-6)", "(8-12)", "(15-20)", "(25-32)", "(38-43)", "(48-53)", "(60-100)"]
 gender_list = ["Male", "Female"]
 
-from ultralytics import YOLO
-
-yolo_model = YOLO("yolov8n.pt")  # person detector
+yolo_model = metrics.load_model("yolov8n", load_yolo, INFERENCE_PROFILE)  # person detector
 
 @app.route('/api/upload_video', methods=['POST'])
 @login_required
@@ -270,6 +184,14 @@ def upload_video():
     if not current_user.is_admin:
         return jsonify(success=False, message="Admin access required"), 403
 
+    with metrics.in_flight('video'):
+        try:
+            return _process_video_upload()
+        except Exception:
+            metrics.ERRORS.inc(pipeline='video')
+            raise
+
+def _process_video_upload():
     file = request.files.get('file')
     if not file:
         return jsonify(success=False, message="No file provided"), 400
@@ -281,64 +203,41 @@ def upload_video():
     if not cap.isOpened():
         return jsonify(success=False, message="Failed to open video"), 400
 
-    tracker = CentroidTracker(maxDisappeared=40)
-
-    prev_positions = {}
-    counted_out = set()
-    out_count = 0
-
     frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 480
-    zone_top = frame_height - 100
-    zone_bottom = frame_height - 20
+    counter = CrowdCounter(frame_height, every_n=2, max_disappeared=40)
+    zone_top, zone_bottom = counter.zone.zone_top, counter.zone.zone_bottom
 
-    frame_no = 0
+    inside = out_count = total_crowd = 0
+    run_start = time.perf_counter()
 
     while True:
-        ret, frame = cap.read()
+        with timed('video', 'decode'):
+            ret, frame = cap.read()
         if not ret:
             break
 
-        frame_no += 1
-        if frame_no % 2 != 0:
+        if not counter.should_process():
+            metrics.FRAMES_DROPPED.inc(pipeline='video', reason='skip')
             continue
 
-        rects = []
-
         # -------- YOLO PERSON DETECTION --------
-        results = yolo_model(frame, conf=0.5, iou=0.45, verbose=False)
-        for r in results:
-            for box in r.boxes:
-                if int(box.cls[0]) == 0:  # PERSON
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    rects.append((x1, y1, x2, y2))
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-
-        objects = tracker.update(rects)
+        with timed('video', 'yolo'):
+            results = yolo_model(frame, conf=0.5, iou=0.45,
+                                 imgsz=INFERENCE_PROFILE["yolo_imgsz"], verbose=False)
+        rects = person_boxes(results)
+        for (x1, y1, x2, y2) in rects:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+
+        # -------- TRACKING + EXIT COUNT --------
+        with timed('video', 'tracking'):
+            objects = counter.update(rects)
         inside = len(objects)
+        out_count = counter.zone.out_count
+        metrics.FRAMES_PROCESSED.inc(pipeline='video')
 
-        # -------- POSITION TRACKING --------
-        for objectID, (cX, cY) in objects.items():
-            prev = prev_positions.get(objectID)
-
-            if cY < zone_top:
-                pos = "above"
-            elif cY > zone_bottom:
-                pos = "below"
-            else:
-                pos = prev
-
-            prev_positions[objectID] = pos
+        for (cX, cY) in objects.values():
             cv2.circle(frame, (cX, cY), 4, (0, 0, 255), -1)
 
-        # -------- EXIT COUNT (WHEN DISAPPEARS) --------
-        current_ids = set(objects.keys())
-        for oid in list(prev_positions.keys()):
-            if oid not in current_ids:
-                if prev_positions[oid] == "above" and oid not in counted_out:
-                    out_count += 1
-                    counted_out.add(oid)
-                prev_positions.pop(oid)
-
         total_crowd = inside + out_count
 
         # -------- DRAW UI --------
@@ -352,25 +251,40 @@ def upload_video():
         cv2.putText(frame, f"CURRENT INSIDE: {inside}", (20, 100),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
 
-        cv2.imshow("YOLOv8 Crowd Counting", frame)
-        if cv2.waitKey(1) & 0xFF == ord("q"):
+        with timed('video', 'display'):
+            cv2.imshow("YOLOv8 Crowd Counting", frame)
+            key = cv2.waitKey(1) & 0xFF
+        if key == ord("q"):
             break
 
     cap.release()
     cv2.destroyAllWindows()
 
+    elapsed = time.perf_counter() - run_start
+    if elapsed > 0:
+        metrics.LAST_RUN_FPS.set(counter.processed / elapsed, pipeline='video')
+
     state['mall']['inside'] = inside
     state['mall']['out'] = out_count
     state['mall']['in'] = total_crowd
 
-    socketio.emit('mall_update', state['mall'])
+    with timed('video', 'emit'):
+        socketio.emit('mall_update', state['mall'])
+    metrics.SOCKET_EMITS.inc(event='mall_update')
     return jsonify(success=True, result=state['mall'])
 
 # ------------------ UPLOAD PHOTO (NEW FIXED VERSION) ------------------
 @app.route("/api/upload_photo", methods=["POST"])
 @login_required
 def upload_photo():
-
+    with metrics.in_flight('photo'):
+        try:
+            return _process_photo_upload()
+        except Exception:
+            metrics.ERRORS.inc(pipeline='photo')
+            raise
+
+def _process_photo_upload():
     file = request.files.get("file")
     if not file:
         return jsonify(success=False, message="No photo uploaded"), 400
@@ -378,12 +292,17 @@ def upload_photo():
     image_path = os.path.join(UPLOAD_DIR, file.filename)
     file.save(image_path)
 
-    img = cv2.imread(image_path)
+    with timed('photo', 'decode'):
+        img = cv2.imread(image_path)
     if img is None:
+        metrics.FRAMES_DROPPED.inc(pipeline='photo', reason='decode_failed')
         return jsonify(success=False, message="Invalid image"), 400
 
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(gray, 1.2, 5)
+    metrics.FRAMES_PROCESSED.inc(pipeline='photo')
+    with timed('photo', 'haar'):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        faces = detect_faces(gray, face_cascade, INFERENCE_PROFILE["face_scale"],
+                             scaleFactor=1.2, minNeighbors=5)
 
     results = []
 
@@ -392,27 +311,8 @@ def upload_photo():
             continue
 
         face = img[y:y+h, x:x+w]
-
-        blob = cv2.dnn.blobFromImage(
-            face,
-            1.0,
-            (227, 227),
-            AGE_MEAN,
-            swapRB=False
-        )
-
-        # Gender prediction
-        gender_net.setInput(blob)
-        gender_preds = gender_net.forward()
-        gender = GENDER_LIST[gender_preds[0].argmax()]
-
-        # Age prediction
-        age_net.setInput(blob)
-        age_preds = age_net.forward()
-        age_range = AGE_LIST[age_preds[0].argmax()]
-
-        # ✅ Convert to correct 5-year band
-        age_group = age_band_to_5yr_group(age_range)
+        gender, age_group = predict_age_gender(face, age_net, gender_net, pipeline='photo')
+        metrics.FACES_PROCESSED.inc(pipeline='photo')
 
         results.append({
             "age": age_group,
@@ -434,8 +334,17 @@ last_face_results = []      # cache results
 # -------- ACCURATE FACE CACHE --------
 face_cache = {}   # key: (x,y,w,h) approx → {age, gender}
 
+def emit_face_data(payload):
+    with timed('webcam', 'emit'):
+        emit('face_data', payload)
+    metrics.SOCKET_EMITS.inc(event='face_data')
+
 @socketio.on('webcam_frame')
 def handle_webcam_frame(data):
+    with metrics.in_flight('webcam'), timed('webcam', 'total'):
+        _process_webcam_frame(data)
+
+def _process_webcam_frame(data):
     global frame_counter, last_face_results
 
     try:
@@ -443,55 +352,46 @@ def handle_webcam_frame(data):
 
         # 🚀 SPEED CONTROL (process only every Nth frame)
         if frame_counter % FACE_PROCESS_EVERY_N_FRAMES != 0:
-            emit('face_data', last_face_results)
+            metrics.FRAMES_DROPPED.inc(pipeline='webcam', reason='skip')
+            emit_face_data(last_face_results)
             return
 
         # ---------- Decode image ----------
-        if ',' in data:
-            img_data = base64.b64decode(data.split(',')[1])
-        else:
-            img_data = base64.b64decode(data)
+        with timed('webcam', 'decode'):
+            if ',' in data:
+                img_data = base64.b64decode(data.split(',')[1])
+            else:
+                img_data = base64.b64decode(data)
 
-        img_array = np.frombuffer(img_data, np.uint8)
-        frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+            img_array = np.frombuffer(img_data, np.uint8)
+            frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
         if frame is None:
-            emit('face_data', last_face_results)
+            metrics.FRAMES_DROPPED.inc(pipeline='webcam', reason='decode_failed')
+            emit_face_data(last_face_results)
             return
 
+        metrics.FRAMES_PROCESSED.inc(pipeline='webcam')
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
         # ---------- FACE DETECTION ----------
-        faces = face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=1.2,
-            minNeighbors=5,
-            minSize=(80, 80)   # ❗ important for accuracy
-        )
+        with timed('webcam', 'haar'):
+            faces = detect_faces(
+                gray,
+                face_cascade,
+                INFERENCE_PROFILE["face_scale"],
+                scaleFactor=1.2,
+                minNeighbors=5,
+                minSize=(80, 80)   # ❗ important for accuracy
+            )
 
         results = []
 
         for (x, y, w, h) in faces:
             face = frame[y:y+h, x:x+w]
 
-            # ---------- PREPROCESS ----------
-            blob = cv2.dnn.blobFromImage(
-                face,
-                1.0,
-                (227, 227),
-                AGE_MEAN,
-                swapRB=False
-            )
-
-            # ---------- GENDER ----------
-            gender_net.setInput(blob)
-            gender_preds = gender_net.forward()
-            gender = GENDER_LIST[gender_preds[0].argmax()]
-
-            # ---------- AGE ----------
-            age_net.setInput(blob)
-            age_preds = age_net.forward()
-            age_range = AGE_LIST[age_preds[0].argmax()]
-            age_group = age_band_to_5yr_group(age_range)
+            # ---------- GENDER + AGE ----------
+            gender, age_group = predict_age_gender(face, age_net, gender_net, pipeline='webcam')
+            metrics.FACES_PROCESSED.inc(pipeline='webcam')
 
             results.append({
                 "x": int(x),
@@ -506,11 +406,12 @@ def handle_webcam_frame(data):
         if results:
             last_face_results = results
 
-        emit('face_data', last_face_results)
+        emit_face_data(last_face_results)
 
     except Exception as e:
+        metrics.ERRORS.inc(pipeline='webcam')
         print("webcam_frame error:", e)
-        emit('face_data', last_face_results)
+        emit_face_data(last_face_results)
 
 
 
@@ -567,6 +468,22 @@ User question:
         return jsonify(reply="AI service unavailable")
 
        
+# ------------------ METRICS (Prometheus text format) ------------------
+# Scrapers can't log in, so /metrics is open to localhost only unless
+# METRICS_TOKEN is set, in which case it needs "Authorization: Bearer <token>".
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_LOCAL_ADDRS = {"127.0.0.1", "::1"}
+
+@app.route('/metrics')
+def prometheus_metrics():
+    if METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+            return Response("Unauthorized\n", status=401)
+    elif request.remote_addr not in METRICS_LOCAL_ADDRS:
+        return Response("Forbidden\n", status=403)
+    return Response(metrics.registry.render(), content_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
 # ------------------ SOCKET: SEND INITIAL DATA TO USER ------------------
 # ------------------ SOCKET: SEND INITIAL DATA TO USER ------------------
 @socketio.on('connect')
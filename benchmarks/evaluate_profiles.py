@@ -0,0 +1,291 @@
+# evaluate_profiles.py
+# Count accuracy vs throughput for each inference profile (utils/inference_profiles.py).
+#
+#   python -m benchmarks.evaluate_profiles --export        # build the exported YOLO models first
+#   python -m benchmarks.evaluate_profiles --fixtures fixtures/ --output profiles.json
+#
+# --fixtures DIR holds videos plus an expected.json with their true counts,
+#   {"entrance.mp4": {"in": 12, "out": 5, "inside": 7}, ...}
+# and optionally a faces/ folder of face images. Fixture videos are counted
+# with each profile's YOLO model, which is the real accuracy-vs-throughput
+# comparison. Without --fixtures (or with --detector contour) the contour
+# detector runs at each profile's input size instead; those numbers are only
+# a proxy for the resolution effect and are labelled as such. Age/gender
+# latency and agreement need the Caffe models in models/ and are "n/a" with
+# the stubs.
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from utils.inference_profiles import (PROFILES, get_profile, apply_thread_settings,
+                                      configure_dnn_net, export_yolo, load_yolo)
+from utils.video_processing import count_frames, predict_age_gender, person_boxes, detect_faces
+from benchmarks.synthetic import SyntheticCrowd, ContourDetector, make_face_crops
+from benchmarks.run_benchmarks import load_face_nets, count_errors, MODEL_DIR
+
+FACE_CASCADE_PATH = os.path.join(MODEL_DIR, 'haarcascade_frontalface_default.xml')
+
+
+# ------------------ FIXTURES ------------------
+def _read_frames(cap):
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+
+def fixture_clips(fixtures_dir):
+    """
+    Yield (name, frames, frame_height, expected) one clip at a time. Frames
+    are decoded lazily; expected() returns the true counts.
+    """
+    with open(os.path.join(fixtures_dir, "expected.json")) as f:
+        expected = json.load(f)
+    for name, counts in expected.items():
+        cap = cv2.VideoCapture(os.path.join(fixtures_dir, name))
+        if not cap.isOpened():
+            raise RuntimeError("Cannot open fixture video: " + name)
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 480
+        yield name, _read_frames(cap), height, (lambda counts=counts: counts)
+
+
+def synthetic_clips(densities, n_frames, seed):
+    """Same shape as fixture_clips; frames are rendered as they are consumed."""
+    for density in densities:
+        crowd = SyntheticCrowd(density=density, seed=seed)
+        yield (f"synthetic_density_{density}", crowd.frames(n_frames),
+               crowd.height, crowd.expected_counts)
+
+
+def load_face_images(fixtures_dir, n_faces, seed):
+    paths = sorted(glob.glob(os.path.join(fixtures_dir or "", "faces", "*")))
+    images = [img for img in (cv2.imread(p) for p in paths) if img is not None]
+    return images or make_face_crops(n_faces, seed=seed)
+
+
+# ------------------ DETECTORS ------------------
+def make_detector(profile, use_yolo):
+    imgsz = profile["yolo_imgsz"]
+    if use_yolo:
+        model = load_yolo(profile)
+        return lambda frame: person_boxes(model(frame, conf=0.5, iou=0.45,
+                                                imgsz=imgsz, verbose=False))
+
+    full_res = ContourDetector()
+
+    def detect(frame):
+        scale = imgsz / max(frame.shape[:2])
+        if scale >= 1.0:
+            return full_res(frame)
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+        contour = ContourDetector(min_area=int(full_res.min_area * scale * scale))
+        return [tuple(int(v / scale) for v in r) for r in contour(small)]
+    return detect
+
+
+# ------------------ THREADS ------------------
+def startup_thread_counts():
+    """(OpenCV, torch) thread counts before any profile touched them."""
+    try:
+        import torch
+        torch_threads = torch.get_num_threads()
+    except ImportError:
+        torch_threads = None
+    return cv2.getNumThreads(), torch_threads
+
+
+def restore_thread_settings(cv2_threads, torch_threads):
+    cv2.setNumThreads(cv2_threads)
+    if torch_threads is not None:
+        import torch
+        torch.set_num_threads(torch_threads)
+
+
+# ------------------ EVALUATION ------------------
+def evaluate_counting(profile, clips, use_yolo):
+    """
+    Run count_frames on each clip in turn; only detection + counting are
+    timed. Counts are read at the last frame, as upload_video does, and
+    each of in/out/inside is scored against the clip's expected counts.
+    """
+    detect = make_detector(profile, use_yolo)
+    per_clip = {}
+    errors = {"in": [], "out": [], "inside": []}
+    fps = []
+    for name, frames, height, expected in clips:
+        measured, processed, elapsed = count_frames(frames, detect, height)
+        truth = expected()
+        clip_fps = processed / elapsed if elapsed > 0 else float("inf")
+        per_clip[name] = {"expected": truth, "measured": measured,
+                          "error": count_errors(measured, truth), "fps": clip_fps}
+        for key in errors:
+            errors[key].append(abs(measured[key] - truth[key]) / max(truth[key], 1))
+        fps.append(clip_fps)
+    count_error = {key: float(np.mean(values)) for key, values in errors.items()}
+    return {
+        "count_accuracy": max(0.0, 1.0 - float(np.mean(list(count_error.values())))),
+        "count_error": count_error,
+        "fps": float(np.mean(fps)),
+        "clips": per_clip,
+    }
+
+
+def evaluate_faces(profile, faces, real_models, face_cascade):
+    age_net, gender_net = load_face_nets(real_models)
+    if real_models:
+        configure_dnn_net(age_net, profile)
+        configure_dnn_net(gender_net, profile)
+
+    predict_age_gender(faces[0], age_net, gender_net)   # warm-up
+    predictions, samples = [], []
+    for face in faces:
+        t0 = time.perf_counter()
+        predictions.append(predict_age_gender(face, age_net, gender_net))
+        samples.append(time.perf_counter() - t0)
+
+    haar_samples, found = [], 0
+    for face in faces:
+        gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+        t0 = time.perf_counter()
+        found += len(detect_faces(gray, face_cascade, profile["face_scale"],
+                                  scaleFactor=1.2, minNeighbors=5))
+        haar_samples.append(time.perf_counter() - t0)
+
+    return {
+        "attr_p50_ms": float(np.percentile(samples, 50) * 1000.0),
+        "haar_p50_ms": float(np.percentile(haar_samples, 50) * 1000.0),
+        "faces_detected": found,
+        "predictions": predictions,
+    }
+
+
+def evaluate(args):
+    use_yolo = args.detector == "yolo"
+    if use_yolo and not args.fixtures:
+        raise SystemExit("--detector yolo needs --fixtures with real videos "
+                         "(YOLO does not detect the synthetic shapes)")
+    real_models = os.path.exists(os.path.join(MODEL_DIR, "age_net.caffemodel")) and \
+        os.path.exists(os.path.join(MODEL_DIR, "gender_net.caffemodel"))
+    faces = load_face_images(args.fixtures, args.faces, args.seed)
+    face_cascade = cv2.CascadeClassifier(FACE_CASCADE_PATH)
+    thread_counts = startup_thread_counts()
+
+    def clips():
+        if args.fixtures:
+            return fixture_clips(args.fixtures)
+        return synthetic_clips(args.densities, args.frames, args.seed)
+
+    report = {}
+    for name in args.profiles:
+        profile = get_profile(name)
+        restore_thread_settings(*thread_counts)
+        apply_thread_settings(profile)
+        result = evaluate_counting(profile, clips(), use_yolo)
+        result.update(evaluate_faces(profile, faces, real_models, face_cascade))
+        result["dnn_precision"] = profile["dnn_precision"]
+        report[name] = result
+    restore_thread_settings(*thread_counts)
+
+    # age/gender agreement with the first (reference) profile's predictions;
+    # meaningless with the stub nets, which ignore the DNN backend/target
+    reference = report[args.profiles[0]]["predictions"]
+    for result in report.values():
+        predictions = result.pop("predictions")
+        if real_models:
+            matches = sum(a == b for a, b in zip(predictions, reference))
+            result["attr_agreement"] = matches / len(reference)
+        else:
+            result["attr_agreement"] = None
+            result["attr_p50_ms"] = None
+
+    if not use_yolo:
+        # contour numbers say nothing about the profile's YOLO weights
+        for result in report.values():
+            result["proxy_count_accuracy"] = result.pop("count_accuracy")
+            result["proxy_count_error"] = result.pop("count_error")
+            result["proxy_fps"] = result.pop("fps")
+
+    return {
+        "detector": "yolo" if use_yolo else "contour (proxy, not the profile's YOLO weights)",
+        "face_nets": "caffe" if real_models else "stub (attr latency/agreement n/a)",
+        "reference_profile": args.profiles[0],
+        "profiles": report,
+    }
+
+
+def print_table(report):
+    proxy = "proxy_fps" in next(iter(report["profiles"].values()))
+    prefix, mark = ("proxy_", "*") if proxy else ("", "")
+    print(f"detector: {report['detector']}, face nets: {report['face_nets']}")
+    print(f"{'profile':10s} {'count acc' + mark:>10s} {'err in':>7s} {'err out':>7s} "
+          f"{'err ins':>7s} {'fps' + mark:>9s} {'dnn':>5s} {'attr ms':>9s} "
+          f"{'agree':>7s} {'haar ms':>9s} {'faces':>6s}")
+    for name, r in report["profiles"].items():
+        err = r[prefix + "count_error"]
+        agree = "n/a" if r["attr_agreement"] is None else f"{r['attr_agreement']:.1%}"
+        attr_ms = "n/a" if r["attr_p50_ms"] is None else f"{r['attr_p50_ms']:.3f}"
+        print(f"{name:10s} {r[prefix + 'count_accuracy']:10.3f} {err['in']:7.3f} "
+              f"{err['out']:7.3f} {err['inside']:7.3f} {r[prefix + 'fps']:9.1f} "
+              f"{r['dnn_precision']:>5s} {attr_ms:>9s} {agree:>7s} "
+              f"{r['haar_p50_ms']:9.3f} {r['faces_detected']:6d}")
+    print("err: mean relative error of each count over the clips")
+    if proxy:
+        print("* contour detector at each profile's input size; "
+              "pass --fixtures to compare the profiles' YOLO models")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate inference profiles")
+    parser.add_argument("--profiles", nargs="+", choices=list(PROFILES), default=list(PROFILES),
+                        help="profiles to compare; the first is the agreement reference")
+    parser.add_argument("--fixtures", help="directory with videos, expected.json and faces/")
+    parser.add_argument("--detector", choices=("yolo", "contour"),
+                        help="default: yolo with --fixtures, contour (proxy) without")
+    parser.add_argument("--densities", type=int, nargs="+", default=[2, 10, 30],
+                        help="synthetic clips when --fixtures is not given")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--faces", type=int, default=100,
+                        help="synthetic face crops when fixtures have no faces/")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--export", action="store_true",
+                        help="build missing exported YOLO models and exit")
+    parser.add_argument("--calibration-data",
+                        help="dataset yaml for INT8 calibration during --export "
+                             "(ultralytics downloads coco8 if omitted)")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+    if args.detector is None:
+        args.detector = "yolo" if args.fixtures else "contour"
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.export:
+        for name in args.profiles:
+            print(name, "->", export_yolo(get_profile(name), data=args.calibration_data))
+        return 0
+
+    report = evaluate(args)
+    print_table(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print("Wrote", args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+# run_benchmarks.py
+# Reproducible benchmarks for the crowd counting and age/gender paths.
+#
+#   python -m benchmarks.run_benchmarks --output bench.json
+#   python -m benchmarks.run_benchmarks --baseline bench.json   # compare, exit 1 on regression
+#
+# Runs from the repository root. Uses synthetic video and stub detectors/nets
+# by default, so no model files are needed; --real-face-models uses the Caffe
+# age/gender nets from models/ instead of the stubs. Every timing is the
+# median of --repeats runs after one warm-up run. --self-check runs the
+# counting loop with the oracle detector and tracker and exits 1 unless every
+# count matches the synthetic ground truth.
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from utils.video_processing import (CentroidTracker, count_frames, predict_age_gender,
+                                    AGE_LIST, GENDER_LIST)
+from benchmarks.synthetic import (SyntheticCrowd, DETECTORS, make_detector, make_face_crops,
+                                  StubNet, OracleTracker)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(ROOT, 'models')
+
+
+def _summary(samples):
+    arr = np.asarray(samples, dtype=np.float64) * 1000.0
+    return {
+        "mean_ms": float(arr.mean()),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+    }
+
+
+def _median_of_repeats(run, repeats):
+    """Call run() once to warm up, then `repeats` times; median of each field."""
+    run()
+    results = [run() for _ in range(repeats)]
+    summary = {key: float(np.median([r[key] for r in results])) for key in results[0]}
+    summary["repeats"] = repeats
+    return summary
+
+
+def count_errors(measured, expected):
+    """Absolute error of each count ("in", "out", "inside")."""
+    return {key: abs(measured[key] - expected[key]) for key in expected}
+
+
+# ------------------ COUNTING ------------------
+def _count_synthetic(density, speed, n_frames, seed, detector_name, oracle_tracker=False):
+    crowd = SyntheticCrowd(density=density, speed=speed, seed=seed)
+    detector = make_detector(detector_name, crowd)
+    tracker = OracleTracker(crowd) if oracle_tracker else None
+    measured, processed, elapsed = count_frames(crowd.frames(n_frames), detector,
+                                                crowd.height, tracker=tracker)
+    return crowd.expected_counts(), measured, processed, elapsed
+
+
+def bench_counting(density, speed, n_frames, detector_name, seed, repeats):
+    """
+    The upload_video counting loop (count_frames) over streamed synthetic
+    frames. detect_track_fps covers detection + tracking + exit zone per
+    processed frame; decoding, rendering and everything after the loop are
+    excluded. count_error is the error per count with the chosen detector.
+    oracle_detector_error is a separate run with a perfect detector, so it
+    is the error the tracker and counting rule make on their own; it is not
+    a part of count_error and the two don't add up.
+    """
+    def run():
+        _, _, processed, elapsed = _count_synthetic(density, speed, n_frames, seed,
+                                                    detector_name)
+        return {"detect_track_fps": processed / elapsed if elapsed > 0 else float("inf")}
+
+    expected, measured, processed, _ = _count_synthetic(
+        density, speed, n_frames, seed, detector_name)
+    _, oracle_measured, _, _ = _count_synthetic(density, speed, n_frames, seed, "oracle")
+    result = _median_of_repeats(run, repeats)
+    result.update({
+        "frames": n_frames,
+        "processed_frames": processed,
+        "expected": expected,
+        "measured": measured,
+        "count_error": count_errors(measured, expected),
+        "oracle_detector_error": count_errors(oracle_measured, expected),
+    })
+    return result
+
+
+# ------------------ TRACKER COST ------------------
+def bench_tracker(density, speed, n_frames, seed, repeats):
+    """Per-frame cost of CentroidTracker.update on ground-truth boxes."""
+    crowd = SyntheticCrowd(density=density, speed=speed, seed=seed)
+    boxes = []
+    for _ in range(n_frames):
+        boxes.append(crowd.boxes())
+        crowd.step()
+
+    def run():
+        tracker = CentroidTracker(maxDisappeared=40)
+        samples = []
+        for rects in boxes:
+            t0 = time.perf_counter()
+            tracker.update(rects)
+            samples.append(time.perf_counter() - t0)
+        return _summary(samples)
+    return _median_of_repeats(run, repeats)
+
+
+# ------------------ FACE ATTRIBUTES ------------------
+def load_face_nets(real):
+    if not real:
+        return StubNet(len(AGE_LIST)), StubNet(len(GENDER_LIST))
+    age_net = cv2.dnn.readNetFromCaffe(os.path.join(MODEL_DIR, "age_deploy.prototxt"),
+                                       os.path.join(MODEL_DIR, "age_net.caffemodel"))
+    gender_net = cv2.dnn.readNetFromCaffe(os.path.join(MODEL_DIR, "gender_deploy.prototxt"),
+                                          os.path.join(MODEL_DIR, "gender_net.caffemodel"))
+    return age_net, gender_net
+
+
+def bench_face_attributes(n_faces, real_models, seed, repeats):
+    """Per-face latency of predict_age_gender (blob + gender net + age net)."""
+    age_net, gender_net = load_face_nets(real_models)
+    crops = make_face_crops(n_faces, seed=seed)
+
+    def run():
+        samples = []
+        for face in crops:
+            t0 = time.perf_counter()
+            predict_age_gender(face, age_net, gender_net)
+            samples.append(time.perf_counter() - t0)
+        return _summary(samples)
+    return _median_of_repeats(run, repeats)
+
+
+# ------------------ RUNNER ------------------
+def self_check(args):
+    """
+    Oracle detector + oracle tracker must reproduce the generator's counts
+    exactly, otherwise frame sampling or the exit-zone rule disagrees with
+    the ground truth. Returns the failing densities.
+    """
+    # end on a processed frame: count_frames only looks at every 2nd one
+    n_frames = args.frames - args.frames % 2
+    failures = []
+    for density in args.densities:
+        expected, measured, _, _ = _count_synthetic(
+            density, args.speed, n_frames, args.seed, "oracle", oracle_tracker=True)
+        status = "ok" if measured == expected else "MISMATCH"
+        print(f"self-check density_{density}: expected {expected} measured {measured} {status}")
+        if measured != expected:
+            failures.append(density)
+    return failures
+
+
+def bench_config(args):
+    return {
+        "densities": args.densities, "speed": args.speed, "frames": args.frames,
+        "faces": args.faces, "detector": args.detector, "seed": args.seed,
+        "real_face_models": args.real_face_models, "repeats": args.repeats,
+    }
+
+
+def run(args):
+    results = {"counting": {}, "tracker": {}, "face_attributes": {}}
+
+    for density in args.densities:
+        key = f"density_{density}"
+        results["counting"][key] = bench_counting(
+            density, args.speed, args.frames, args.detector, args.seed, args.repeats)
+        results["tracker"][key] = bench_tracker(
+            density, args.speed, args.frames, args.seed, args.repeats)
+
+    face_key = "caffe" if args.real_face_models else "stub"
+    results["face_attributes"][face_key] = bench_face_attributes(
+        args.faces, args.real_face_models, args.seed, args.repeats)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "config": bench_config(args),
+        },
+        "results": results,
+    }
+
+
+def headline_metrics(report):
+    """Flatten a report to {name: (value, higher_is_better)} for comparison."""
+    flat = {}
+    res = report["results"]
+    for key, r in res.get("counting", {}).items():
+        flat[f"counting.{key}.detect_track_fps"] = (r["detect_track_fps"], True)
+    for key, r in res.get("tracker", {}).items():
+        flat[f"tracker.{key}.p50_ms"] = (r["p50_ms"], False)
+    for key, r in res.get("face_attributes", {}).items():
+        flat[f"face_attributes.{key}.p50_ms"] = (r["p50_ms"], False)
+    return flat
+
+
+def config_mismatch(config, baseline):
+    """Config keys whose values differ from the baseline report's meta.config."""
+    previous = baseline.get("meta", {}).get("config", {})
+    return sorted(key for key in set(config) | set(previous)
+                  if config.get(key) != previous.get(key))
+
+
+def compare(report, baseline, tolerance):
+    """Print current vs baseline and return the names of regressed metrics."""
+    current = headline_metrics(report)
+    previous = headline_metrics(baseline)
+    regressions = []
+    for name, (value, higher_better) in current.items():
+        if name not in previous:
+            continue
+        old = previous[name][0]
+        change = (value - old) / old if old else 0.0
+        worse = -change if higher_better else change
+        flag = "REGRESSION" if worse > tolerance else ""
+        print(f"{name:50s} {old:12.4f} -> {value:12.4f} ({change:+.1%}) {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def print_report(report):
+    for name, (value, _) in headline_metrics(report).items():
+        print(f"{name:50s} {value:12.4f}")
+    for key, r in report["results"]["counting"].items():
+        print(f"count {key}: expected {r['expected']} measured {r['measured']} "
+              f"error {r['count_error']}, error with oracle detector "
+              f"{r['oracle_detector_error']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Crowd monitoring benchmarks")
+    parser.add_argument("--densities", type=int, nargs="+", default=[2, 10, 30],
+                        help="people on screen per scenario")
+    parser.add_argument("--speed", type=float, default=4.0, help="walking speed, px/frame")
+    parser.add_argument("--frames", type=int, default=300, help="frames per scenario")
+    parser.add_argument("--faces", type=int, default=200, help="face crops to classify")
+    parser.add_argument("--detector", choices=DETECTORS, default="contour")
+    parser.add_argument("--real-face-models", action="store_true",
+                        help="use the Caffe age/gender nets from models/ instead of stubs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="timed runs per scenario after one warm-up; the median is reported")
+    parser.add_argument("--self-check", action="store_true",
+                        help="verify the oracle detector reproduces the ground truth and exit")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed relative slowdown before flagging a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.self_check:
+        return 1 if self_check(args) else 0
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatch = config_mismatch(bench_config(args), baseline)
+        if mismatch:
+            print(f"Not comparing: {args.baseline} was run with a different config "
+                  f"({', '.join(mismatch)})")
+            return 2
+
+    report = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print("Wrote", args.output)
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed beyond {args.tolerance:.0%}")
+            return 1
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
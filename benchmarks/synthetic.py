@@ -0,0 +1,272 @@
+# synthetic.py
+# Synthetic crowd video, face fixtures and detector/net stubs for the benchmarks.
+# Nothing here needs a model download: the "people" are drawn shapes on a plain
+# background and the stubs stand in for YOLO and the Caffe age/gender nets.
+#
+#   python -m benchmarks.synthetic --output fixtures/    # write clips + expected.json + faces/
+#
+# The written directory can be passed to benchmarks/evaluate_profiles.py --fixtures.
+
+import argparse
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+BACKGROUND = (60, 60, 60)
+
+
+# ------------------ SYNTHETIC CROWD VIDEO ------------------
+class SyntheticCrowd:
+    """
+    Generates frames with `density` people on screen at any time, walking
+    vertically through the scene at roughly `speed` px/frame. A person who
+    leaves the frame is replaced by a new one, so density stays constant.
+
+    Ground truth comes from the generator's own events: people who walked
+    out through the top edge have left (upload_video counts an exit when a
+    track disappears above the exit zone), people still visible are inside.
+    People who walk out through the bottom pass back through the exit zone
+    and are not counted either way.
+    """
+    def __init__(self, width=640, height=480, density=5, speed=4.0,
+                 person_size=(30, 70), seed=0):
+        self.width = width
+        self.height = height
+        self.density = density
+        self.speed = speed
+        self.person_w, self.person_h = person_size
+        self.rng = np.random.default_rng(seed)
+        self.people = []   # [person_id, x, y, vx, vy, color]
+        self.spawned = 0
+        self.exited_top = 0
+        for _ in range(density):
+            self._spawn(anywhere=True)
+
+    def _spawn(self, anywhere=False):
+        x = self.rng.uniform(0, self.width - self.person_w)
+        up = self.rng.random() < 0.5
+        if anywhere:
+            y = self.rng.uniform(0, self.height - self.person_h)
+        else:
+            y = float(self.height) if up else float(-self.person_h)
+        vy = -self.speed if up else self.speed
+        vy *= self.rng.uniform(0.7, 1.3)
+        vx = self.rng.uniform(-0.3, 0.3) * self.speed
+        color = tuple(int(c) for c in self.rng.integers(120, 255, size=3))
+        self.people.append([self.spawned, x, y, vx, vy, color])
+        self.spawned += 1
+
+    def step(self):
+        """Advance everyone by one frame and respawn whoever left."""
+        alive = []
+        for pid, x, y, vx, vy, color in self.people:
+            x = min(max(x + vx, 0), self.width - self.person_w)
+            y += vy
+            if y + self.person_h <= 0:
+                self.exited_top += 1
+                continue
+            if y > self.height:
+                continue
+            alive.append([pid, x, y, vx, vy, color])
+        self.people = alive
+        while len(self.people) < self.density:
+            self._spawn()
+
+    def _visible(self):
+        for pid, x, y, _, _, _ in self.people:
+            x1, y1 = int(x), int(y)
+            x2, y2 = x1 + self.person_w, y1 + self.person_h
+            x1, y1 = max(x1, 0), max(y1, 0)
+            x2, y2 = min(x2, self.width - 1), min(y2, self.height - 1)
+            if x2 > x1 and y2 > y1:
+                yield pid, (x1, y1, x2, y2)
+
+    def boxes(self):
+        """Visible person boxes (x1, y1, x2, y2), clipped to the frame."""
+        return [box for _, box in self._visible()]
+
+    def objects(self):
+        """True identities -> centroid, computed like CentroidTracker does."""
+        return {pid: (int((x1 + x2) / 2.0), int((y1 + y2) / 2.0))
+                for pid, (x1, y1, x2, y2) in self._visible()}
+
+    def render(self):
+        frame = np.full((self.height, self.width, 3), BACKGROUND, dtype=np.uint8)
+        for _, x, y, _, _, color in self.people:
+            x1, y1 = int(x), int(y)
+            head = self.person_w // 3
+            cv2.rectangle(frame, (x1, y1 + 2 * head),
+                          (x1 + self.person_w, y1 + self.person_h), color, -1)
+            cv2.circle(frame, (x1 + self.person_w // 2, y1 + head), head, color, -1)
+        return frame
+
+    def frames(self, n_frames):
+        """
+        Yield n_frames consecutive frames, rendered one at a time. The crowd
+        is stepped just before each frame after the first, so boxes() and
+        expected_counts() describe the frame just yielded.
+        """
+        for frame_no in range(n_frames):
+            if frame_no:
+                self.step()
+            yield self.render()
+
+    def expected_counts(self):
+        """True counts at the current frame (the last one, once a clip is consumed)."""
+        inside = len(self.boxes())
+        return {"in": inside + self.exited_top, "out": self.exited_top, "inside": inside}
+
+
+def write_video(path, frames, fps=25):
+    """Write an iterable of BGR frames to `path` (mp4v) and return the frame count."""
+    writer = None
+    count = 0
+    for frame in frames:
+        if writer is None:
+            h, w = frame.shape[:2]
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+        writer.write(frame)
+        count += 1
+    if writer is not None:
+        writer.release()
+    return count
+
+
+# ------------------ DETECTOR STUBS ------------------
+class OracleDetector:
+    """Returns the crowd's ground-truth boxes, optionally dropping a fraction of them."""
+    def __init__(self, crowd, miss_rate=0.0, seed=0):
+        self.crowd = crowd
+        self.miss_rate = miss_rate
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, frame):
+        boxes = self.crowd.boxes()
+        if not self.miss_rate:
+            return boxes
+        return [b for b in boxes if self.rng.random() >= self.miss_rate]
+
+
+class OracleTracker:
+    """
+    Tracker stand-in that reports the crowd's true identities, with no
+    disappearance window. Paired with OracleDetector it isolates the counting
+    rule and frame sampling from tracker errors (ID re-use, lingering tracks).
+    """
+    def __init__(self, crowd):
+        self.crowd = crowd
+        self.objects = {}
+
+    def update(self, rects):
+        self.objects = self.crowd.objects() if rects else {}
+        return self.objects
+
+
+class ContourDetector:
+    """
+    Finds people by thresholding against the plain background. Does real
+    per-pixel work (so it scales with resolution) and merges overlapping
+    people like a real detector would at high density.
+    """
+    def __init__(self, min_area=200):
+        self.min_area = min_area
+
+    def __call__(self, frame):
+        diff = cv2.absdiff(frame, np.array(BACKGROUND, dtype=np.uint8))
+        mask = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY) > 20
+        contours, _ = cv2.findContours(mask.astype(np.uint8), cv2.RETR_EXTERNAL,
+                                       cv2.CHAIN_APPROX_SIMPLE)
+        rects = []
+        for c in contours:
+            x, y, w, h = cv2.boundingRect(c)
+            if w * h >= self.min_area:
+                rects.append((x, y, x + w, y + h))
+        return rects
+
+
+DETECTORS = ("oracle", "contour")
+
+
+def make_detector(name, crowd):
+    if name == "oracle":
+        return OracleDetector(crowd)
+    if name == "contour":
+        return ContourDetector()
+    raise ValueError(f"Unknown detector '{name}'. Choose one of: {', '.join(DETECTORS)}")
+
+
+# ------------------ FACE FIXTURES ------------------
+def make_face_crops(n, sizes=(80, 120, 200), seed=0):
+    """Synthetic BGR face-like crops (skin ellipse, eyes, mouth) of the given sizes."""
+    rng = np.random.default_rng(seed)
+    crops = []
+    for i in range(n):
+        s = sizes[i % len(sizes)]
+        img = rng.integers(0, 60, size=(s, s, 3), dtype=np.uint8)
+        skin = tuple(int(c) for c in rng.integers((90, 120, 160), (140, 170, 230)))
+        cv2.ellipse(img, (s // 2, s // 2), (s * 2 // 5, s // 2 - 2), 0, 0, 360, skin, -1)
+        for ex in (s // 3, 2 * s // 3):
+            cv2.circle(img, (ex, s * 2 // 5), max(s // 20, 2), (30, 30, 30), -1)
+        cv2.ellipse(img, (s // 2, s * 7 // 10), (s // 6, s // 20 + 1), 0, 0, 180, (40, 40, 120), 2)
+        crops.append(img)
+    return crops
+
+
+class StubNet:
+    """
+    Stand-in for a cv2.dnn Net with the setInput/forward interface used by
+    predict_age_gender. forward() does a small reduction over the blob so the
+    output depends on the input, and returns one row of `n_classes` scores.
+    """
+    def __init__(self, n_classes):
+        self.n_classes = n_classes
+        self._blob = None
+
+    def setInput(self, blob):
+        self._blob = blob
+
+    def forward(self):
+        pooled = self._blob.reshape(self._blob.shape[1], -1).mean(axis=1)
+        scores = np.resize(pooled, self.n_classes)
+        return scores.reshape(1, -1)
+
+
+# ------------------ FIXTURE WRITER ------------------
+def write_fixtures(output_dir, densities, n_frames, speed, n_faces, seed, fps=25):
+    """Write one clip per density, expected.json and faces/ into output_dir."""
+    os.makedirs(os.path.join(output_dir, "faces"), exist_ok=True)
+    expected = {}
+    for density in densities:
+        name = f"synthetic_density_{density}.mp4"
+        crowd = SyntheticCrowd(density=density, speed=speed, seed=seed)
+        write_video(os.path.join(output_dir, name), crowd.frames(n_frames), fps)
+        expected[name] = crowd.expected_counts()
+    with open(os.path.join(output_dir, "expected.json"), "w") as f:
+        json.dump(expected, f, indent=2)
+    for i, face in enumerate(make_face_crops(n_faces, seed=seed)):
+        cv2.imwrite(os.path.join(output_dir, "faces", f"face_{i:03d}.png"), face)
+    return expected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic crowd fixtures")
+    parser.add_argument("--output", required=True, help="fixtures directory to create")
+    parser.add_argument("--densities", type=int, nargs="+", default=[2, 10, 30])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--speed", type=float, default=4.0)
+    parser.add_argument("--faces", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    expected = write_fixtures(args.output, args.densities, args.frames,
+                              args.speed, args.faces, args.seed)
+    for name, counts in expected.items():
+        print(name, counts)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# test_video_processing.py
+# Hand-built scenarios for the tracker and exit-zone counting used by upload_video.
+#
+#   python -m pytest -q
+
+from utils.video_processing import CentroidTracker, ExitZoneCounter, count_frames
+
+HEIGHT = 480   # exit zone: above y < 380, below y > 460
+
+
+def box(cx, cy, half=10):
+    return (cx - half, cy - half, cx + half, cy + half)
+
+
+# ------------------ CENTROID TRACKER ------------------
+def test_tracker_registers_new_objects():
+    tracker = CentroidTracker()
+    objects = tracker.update([box(100, 100), box(300, 200)])
+    assert dict(objects) == {0: (100, 100), 1: (300, 200)}
+
+
+def test_tracker_keeps_ids_for_nearest_match():
+    tracker = CentroidTracker()
+    tracker.update([box(100, 100), box(300, 200)])
+    objects = tracker.update([box(305, 195), box(104, 108)])
+    assert dict(objects) == {0: (104, 108), 1: (305, 195)}
+
+
+def test_tracker_registers_extra_detection_with_next_id():
+    tracker = CentroidTracker()
+    tracker.update([box(100, 100)])
+    objects = tracker.update([box(102, 100), box(400, 400)])
+    assert dict(objects) == {0: (102, 100), 1: (400, 400)}
+
+
+def test_tracker_deregisters_after_max_disappeared():
+    tracker = CentroidTracker(maxDisappeared=2)
+    tracker.update([box(100, 100)])
+    assert 0 in tracker.update([])
+    assert 0 in tracker.update([])
+    assert 0 not in tracker.update([])
+
+
+def test_tracker_deregisters_unmatched_object_while_others_move():
+    tracker = CentroidTracker(maxDisappeared=1)
+    tracker.update([box(100, 100), box(300, 300)])
+    tracker.update([box(300, 302)])
+    objects = tracker.update([box(300, 304)])
+    assert dict(objects) == {1: (300, 304)}
+
+
+def test_tracker_new_id_after_deregistration():
+    tracker = CentroidTracker(maxDisappeared=0)
+    tracker.update([box(100, 100)])
+    tracker.update([])
+    assert dict(tracker.update([box(100, 100)])) == {1: (100, 100)}
+
+
+# ------------------ EXIT ZONE ------------------
+def test_exit_counted_when_last_seen_above_zone():
+    zone = ExitZoneCounter(HEIGHT)
+    zone.update({0: (100, 200)})
+    assert zone.update({}) == 1
+
+
+def test_exit_not_counted_when_last_seen_below_zone():
+    zone = ExitZoneCounter(HEIGHT)
+    zone.update({0: (100, 200)})
+    zone.update({0: (100, 470)})
+    assert zone.update({}) == 0
+
+
+def test_zone_keeps_previous_side():
+    zone = ExitZoneCounter(HEIGHT)
+    zone.update({0: (100, 200), 1: (300, 470)})
+    zone.update({0: (100, 420), 1: (300, 420)})   # both inside the zone band
+    assert zone.update({}) == 1                   # only 0 was last seen above
+
+
+def test_first_seen_inside_zone_is_not_counted():
+    zone = ExitZoneCounter(HEIGHT)
+    zone.update({0: (100, 420)})
+    assert zone.update({}) == 0
+
+
+def test_each_id_counted_once():
+    zone = ExitZoneCounter(HEIGHT)
+    zone.update({0: (100, 200)})
+    zone.update({})
+    zone.update({0: (100, 200)})   # tracker re-used the id
+    assert zone.update({}) == 1
+
+
+# ------------------ COUNTING LOOP ------------------
+def test_count_frames_reads_counts_at_last_frame():
+    # one person walks up and leaves, another is still on screen at the end
+    tracks = [[box(100, 300), box(400, 470)],
+              [box(100, 200), box(400, 460)],
+              [box(400, 450)],
+              [box(400, 440)]]
+    detections = iter(tracks)
+    frames = range(2 * len(tracks))   # every 2nd frame is processed
+
+    counts, processed, _ = count_frames(frames, lambda frame: next(detections), HEIGHT,
+                                        tracker=CentroidTracker(maxDisappeared=0))
+    assert processed == len(tracks)
+    assert counts == {"in": 2, "out": 1, "inside": 1}
@@ -0,0 +1,155 @@
+# inference_profiles.py
+# CPU inference profiles for the vision stack ("accurate", "balanced", "fast").
+# A profile picks the YOLO weights/export format and input size, the Haar
+# detection scale, the OpenCV DNN backend/target for the Caffe age/gender nets
+# and the thread count. Select one with the INFERENCE_PROFILE env variable.
+
+import os
+import shutil
+
+import cv2
+
+ROOT = os.getcwd()
+MODEL_DIR = os.path.join(ROOT, 'models')
+
+BASE_YOLO_WEIGHTS = "yolov8n.pt"
+DEFAULT_PROFILE = "accurate"
+
+
+def _available_cpus():
+    # CPUs this process may run on (respects taskset/cgroup cpusets)
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# ------------------ PROFILES ------------------
+# yolo_weights: None -> BASE_YOLO_WEIGHTS, else a file/dir inside models/
+# yolo_export:  ultralytics export() kwargs used to build yolo_weights
+# face_scale:   Haar cascade runs on the frame resized by this factor
+# threads:      None keeps the OpenCV/torch default
+PROFILES = {
+    "accurate": {
+        "yolo_weights": None,
+        "yolo_export": None,
+        "yolo_imgsz": 640,
+        "face_scale": 1.0,
+        "dnn_backend": cv2.dnn.DNN_BACKEND_OPENCV,
+        "dnn_target": cv2.dnn.DNN_TARGET_CPU,
+        "threads": None,
+    },
+    "balanced": {
+        "yolo_weights": "yolov8n_480.onnx",
+        "yolo_export": {"format": "onnx", "simplify": True},
+        "yolo_imgsz": 480,
+        "face_scale": 0.75,
+        "dnn_backend": cv2.dnn.DNN_BACKEND_OPENCV,
+        "dnn_target": cv2.dnn.DNN_TARGET_CPU,
+        "threads": _available_cpus(),
+    },
+    "fast": {
+        "yolo_weights": "yolov8n_320_int8_openvino_model",
+        "yolo_export": {"format": "openvino", "int8": True},
+        "yolo_imgsz": 320,
+        "face_scale": 0.5,
+        "dnn_backend": cv2.dnn.DNN_BACKEND_OPENCV,
+        # FP16 on CPU only runs on ARMv8 (NEON FP16); get_profile() swaps it
+        # for FP32 DNN_TARGET_CPU on x86, where OpenCV would ignore it anyway
+        "dnn_target": getattr(cv2.dnn, "DNN_TARGET_CPU_FP16", cv2.dnn.DNN_TARGET_CPU),
+        "threads": _available_cpus(),
+    },
+}
+
+
+def get_profile(name=None):
+    """
+    Return the profile dict for `name` (default: $INFERENCE_PROFILE or
+    "accurate"). $INFERENCE_THREADS overrides the profile's thread count.
+    """
+    name = (name or os.getenv("INFERENCE_PROFILE") or DEFAULT_PROFILE).lower()
+    if name not in PROFILES:
+        raise ValueError(f"Unknown inference profile '{name}'. "
+                         f"Choose one of: {', '.join(PROFILES)}")
+    profile = dict(PROFILES[name], name=name)
+    if os.getenv("INFERENCE_THREADS"):
+        profile["threads"] = int(os.getenv("INFERENCE_THREADS"))
+    _resolve_dnn_target(profile)
+    return profile
+
+
+def _resolve_dnn_target(profile):
+    """
+    Replace a DNN target this OpenCV build/CPU can't run with FP32
+    DNN_TARGET_CPU, and record the precision actually used in
+    profile["dnn_precision"].
+    """
+    target = profile["dnn_target"]
+    if target not in cv2.dnn.getAvailableTargets(profile["dnn_backend"]):
+        print(f"Inference profile '{profile['name']}': DNN target {target} is not "
+              f"supported on this CPU, using FP32 DNN_TARGET_CPU for age/gender nets")
+        target = cv2.dnn.DNN_TARGET_CPU
+    profile["dnn_target"] = target
+    fp16 = getattr(cv2.dnn, "DNN_TARGET_CPU_FP16", None)
+    profile["dnn_precision"] = "fp16" if fp16 is not None and target == fp16 else "fp32"
+
+
+def apply_thread_settings(profile):
+    threads = profile["threads"]
+    if threads is None:
+        return
+    cv2.setNumThreads(threads)
+    try:
+        import torch   # only present with the ultralytics .pt backend
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def configure_dnn_net(net, profile):
+    """Apply the profile's DNN backend/target to a cv2.dnn Net and return it."""
+    net.setPreferableBackend(profile["dnn_backend"])
+    net.setPreferableTarget(profile["dnn_target"])
+    return net
+
+
+# ------------------ YOLO ------------------
+def yolo_weights_path(profile):
+    if profile["yolo_weights"] is None:
+        return BASE_YOLO_WEIGHTS
+    return os.path.join(MODEL_DIR, profile["yolo_weights"])
+
+
+def export_yolo(profile, data=None):
+    """
+    Build the profile's exported YOLO model from BASE_YOLO_WEIGHTS with
+    ultralytics export() and move it into models/. Returns the weights path.
+    `data` is the dataset yaml used for INT8 calibration; ultralytics
+    downloads coco8 when it is not given.
+    """
+    target = yolo_weights_path(profile)
+    if profile["yolo_export"] is None or os.path.exists(target):
+        return target
+
+    from ultralytics import YOLO
+
+    options = dict(profile["yolo_export"])
+    if data and options.get("int8"):
+        options["data"] = data
+    exported = YOLO(BASE_YOLO_WEIGHTS).export(imgsz=profile["yolo_imgsz"], **options)
+    shutil.move(str(exported), target)
+    return target
+
+
+def load_yolo(profile):
+    """
+    Load the YOLO detector for a profile. Falls back to BASE_YOLO_WEIGHTS
+    (at the profile's input size) when the exported model has not been built.
+    """
+    from ultralytics import YOLO
+
+    weights = yolo_weights_path(profile)
+    if not os.path.exists(weights) and weights != BASE_YOLO_WEIGHTS:
+        print(f"Inference profile '{profile['name']}': {weights} not found, "
+              f"using {BASE_YOLO_WEIGHTS} (run benchmarks/evaluate_profiles.py --export)")
+        weights = BASE_YOLO_WEIGHTS
+    return YOLO(weights, task="detect")
@@ -0,0 +1,219 @@
+# metrics.py
+# Lightweight in-process instrumentation for the vision pipeline.
+# Exposes counters, gauges and latency histograms in Prometheus text format
+# without pulling in an extra dependency. Every update is a dict lookup plus
+# a few additions under a lock, so it is cheap enough to leave on.
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds (decode ~1ms up to a slow YOLO pass on CPU)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# ------------------ METRIC TYPES ------------------
+class Counter:
+    """Monotonically increasing value, one series per label set."""
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple((name, labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down (queue depths, people inside, ...)."""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, Prometheus style."""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # label key -> [per-bucket hits..., +Inf hits, sum, count]
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple((name, labels.get(name, "")) for name in self.labelnames)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [0] * (len(self.buckets) + 3)
+                self._series[key] = series
+            slot = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    slot = i
+                    break
+            series[slot] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, hits in zip(self.buckets + (float("inf"),), series[:-2]):
+                cumulative += hits
+                labels = key + (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+# ------------------ REGISTRY ------------------
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        """Return every metric in Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = MetricsRegistry()
+
+# ------------------ PIPELINE METRICS ------------------
+STAGE_LATENCY = registry.histogram(
+    "crowd_stage_latency_seconds",
+    "Latency of each pipeline stage.",
+    ("pipeline", "stage"))
+FRAMES_PROCESSED = registry.counter(
+    "crowd_frames_processed_total",
+    "Frames that went through detection.",
+    ("pipeline",))
+FRAMES_DROPPED = registry.counter(
+    "crowd_frames_dropped_total",
+    "Frames skipped or discarded, by reason.",
+    ("pipeline", "reason"))
+FACES_PROCESSED = registry.counter(
+    "crowd_faces_processed_total",
+    "Faces run through the age/gender networks.",
+    ("pipeline",))
+ERRORS = registry.counter(
+    "crowd_pipeline_errors_total",
+    "Exceptions raised inside a pipeline.",
+    ("pipeline",))
+IN_FLIGHT = registry.gauge(
+    "crowd_requests_in_flight",
+    "Requests currently being processed (queue depth).",
+    ("pipeline",))
+SOCKET_EMITS = registry.counter(
+    "crowd_socketio_emits_total",
+    "Socket.IO events emitted by the server.",
+    ("event",))
+LAST_RUN_FPS = registry.gauge(
+    "crowd_last_run_fps",
+    "Frames per second of the most recent batch run.",
+    ("pipeline",))
+MODEL_LOAD_SECONDS = registry.gauge(
+    "crowd_model_load_seconds",
+    "Wall time spent loading each model at startup.",
+    ("model",))
+
+
+@contextmanager
+def timed(pipeline, stage):
+    """Record the wall time of the wrapped block into STAGE_LATENCY."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start,
+                              pipeline=pipeline, stage=stage)
+
+
+@contextmanager
+def in_flight(pipeline):
+    """Track how many requests of a pipeline are running concurrently."""
+    IN_FLIGHT.inc(pipeline=pipeline)
+    try:
+        yield
+    finally:
+        IN_FLIGHT.dec(pipeline=pipeline)
+
+
+def load_model(name, loader, *args, **kwargs):
+    """Call loader(*args, **kwargs) and record how long it took."""
+    start = time.perf_counter()
+    model = loader(*args, **kwargs)
+    MODEL_LOAD_SECONDS.set(time.perf_counter() - start, model=name)
+    return model
@@ -1,11 +1,63 @@
 # video_processing.py
 # Utility module to process videos and count people entering, leaving, and inside a space.
 
+import time
+
 import cv2
 import numpy as np
 from collections import OrderedDict
+from contextlib import nullcontext
 from scipy.spatial import distance as dist
 
+from utils.metrics import timed
+
+# ------------------ AGE / GENDER LABELS ------------------
+AGE_LIST = ['(0-2)', '(4-6)', '(8-12)', '(15-20)',
+            '(25-32)', '(38-43)', '(48-53)', '(60-100)']
+
+GENDER_LIST = ['Male', 'Female']
+
+AGE_MEAN = (78.4263377603, 87.7689143744, 114.895847746)
+
+
+# ✅ FIXED 5-YEAR AGE GROUP MAPPING
+def age_band_to_5yr_group(age_range):
+    mapping = {
+        "(0-2)": "0-5",
+        "(4-6)": "5-10",
+        "(8-12)": "10-15",
+        "(15-20)": "15-20",
+        "(25-32)": "20-25",
+        "(38-43)": "35-40",
+        "(48-53)": "45-50",
+        "(60-100)": "60+"
+    }
+    return mapping.get(age_range, "Unknown")
+
+
+def predict_age_gender(face, age_net, gender_net, pipeline=None):
+    """
+    Run the Caffe gender and age nets on one BGR face crop.
+    Returns (gender, 5-year age group). When `pipeline` is given,
+    each net's latency is recorded under that pipeline label.
+    """
+    def stage(name):
+        return timed(pipeline, name) if pipeline else nullcontext()
+
+    blob = cv2.dnn.blobFromImage(face, 1.0, (227, 227), AGE_MEAN, swapRB=False)
+
+    with stage('gender_net'):
+        gender_net.setInput(blob)
+        gender_preds = gender_net.forward()
+    gender = GENDER_LIST[gender_preds[0].argmax()]
+
+    with stage('age_net'):
+        age_net.setInput(blob)
+        age_preds = age_net.forward()
+    age_range = AGE_LIST[age_preds[0].argmax()]
+
+    return gender, age_band_to_5yr_group(age_range)
+
 # ------------------ SIMPLE CENTROID TRACKER ------------------
 class CentroidTracker:
     def __init__(self, maxDisappeared=40):
@@ -75,6 +127,116 @@ class CentroidTracker:
 
         return self.objects
 
+# ------------------ DETECTION HELPERS ------------------
+def person_boxes(results):
+    """Person boxes (x1, y1, x2, y2) from ultralytics YOLO results."""
+    rects = []
+    for r in results:
+        for box in r.boxes:
+            if int(box.cls[0]) == 0:  # PERSON
+                x1, y1, x2, y2 = map(int, box.xyxy[0])
+                rects.append((x1, y1, x2, y2))
+    return rects
+
+
+def detect_faces(gray, face_cascade, scale=1.0, minSize=(0, 0), **kwargs):
+    """
+    Haar face detection on a copy of `gray` resized by `scale` (< 1 trades
+    small-face recall for speed). Boxes are returned in original coordinates.
+    """
+    if scale == 1.0:
+        return face_cascade.detectMultiScale(gray, minSize=minSize, **kwargs)
+
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    min_size = (int(minSize[0] * scale), int(minSize[1] * scale))
+    faces = face_cascade.detectMultiScale(small, minSize=min_size, **kwargs)
+    return [tuple(int(v / scale) for v in face) for face in faces]
+
+
+# ------------------ EXIT ZONE COUNTER ------------------
+class ExitZoneCounter:
+    """
+    Counts people who leave the scene from above the exit zone, which is a
+    horizontal band near the bottom of the frame (used by upload_video).
+    """
+    def __init__(self, frame_height, zone_offset=100, zone_margin=20):
+        self.zone_top = frame_height - zone_offset
+        self.zone_bottom = frame_height - zone_margin
+        self.prev_positions = {}
+        self.counted_out = set()
+        self.out_count = 0
+
+    def update(self, objects):
+        # objects: tracker output, id -> (cX, cY)
+        for objectID, (cX, cY) in objects.items():
+            if cY < self.zone_top:
+                pos = "above"
+            elif cY > self.zone_bottom:
+                pos = "below"
+            else:
+                pos = self.prev_positions.get(objectID)
+            self.prev_positions[objectID] = pos
+
+        # exit counted when an object disappears while last seen above the zone
+        for oid in list(self.prev_positions.keys()):
+            if oid not in objects:
+                if self.prev_positions[oid] == "above" and oid not in self.counted_out:
+                    self.out_count += 1
+                    self.counted_out.add(oid)
+                self.prev_positions.pop(oid)
+
+        return self.out_count
+
+# ------------------ CROWD COUNTING LOOP ------------------
+class CrowdCounter:
+    """
+    The per-frame counting step of upload_video: only every `every_n`-th
+    frame is processed, through CentroidTracker and ExitZoneCounter.
+    """
+    def __init__(self, frame_height, every_n=2, max_disappeared=40, tracker=None):
+        self.tracker = tracker or CentroidTracker(maxDisappeared=max_disappeared)
+        self.zone = ExitZoneCounter(frame_height)
+        self.every_n = every_n
+        self.frame_no = 0
+        self.processed = 0
+
+    def should_process(self):
+        """Call once per decoded frame; False means skip this frame."""
+        self.frame_no += 1
+        return self.frame_no % self.every_n == 0
+
+    def update(self, rects):
+        objects = self.tracker.update(rects)
+        self.zone.update(objects)
+        self.processed += 1
+        return objects
+
+    def counts(self):
+        inside = len(self.tracker.objects)
+        out = self.zone.out_count
+        return {'in': inside + out, 'out': out, 'inside': inside}
+
+
+def count_frames(frames, detect, frame_height, every_n=2, tracker=None):
+    """
+    Run the upload_video counting loop over an iterable of frames, one at a
+    time. Only detect(frame) and the counting step are timed, so decoding or
+    rendering frames is excluded. Counts are read at the last frame, as
+    upload_video does, so tracks still within the tracker's disappearance
+    window count as inside. `tracker` replaces the default CentroidTracker
+    (anything with update(rects) and objects).
+    Returns (counts, processed_frames, elapsed_seconds).
+    """
+    counter = CrowdCounter(frame_height, every_n=every_n, tracker=tracker)
+    elapsed = 0.0
+    for frame in frames:
+        if not counter.should_process():
+            continue
+        t0 = time.perf_counter()
+        counter.update(detect(frame))
+        elapsed += time.perf_counter() - t0
+    return counter.counts(), counter.processed, elapsed
+
 # ------------------ MAIN VIDEO PROCESSING FUNCTION ------------------
 def analyze_video(video_path):
     """